@@ -1,12 +1,18 @@
 """Authentication module."""
 
-from app.auth.auth_handler import authenticate_user, create_user, hash_password
+from app.auth.auth_handler import (
+    authenticate_user,
+    calibrate_bcrypt_rounds,
+    create_user,
+    hash_password,
+)
 from app.auth.database import get_db_session, init_database
 from app.auth.models import User
 
 __all__ = [
     "User",
     "authenticate_user",
+    "calibrate_bcrypt_rounds",
     "create_user",
     "hash_password",
     "get_db_session",
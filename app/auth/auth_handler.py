@@ -1,28 +1,108 @@
 """Authentication handler with bcrypt password hashing."""
 
 import logging
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from typing import Optional, Tuple
 
 import bcrypt
+from sqlalchemy.exc import IntegrityError
 
 from app.auth.database import get_db_session
 from app.auth.models import User
+from app.config import get_settings
+from app.utils.profiling import timed
 
 logger = logging.getLogger(__name__)
 
+# bcrypt only accepts passwords up to 72 bytes
+MAX_PASSWORD_BYTES = 72
 
-def hash_password(password: str) -> str:
+_bcrypt_rounds: Optional[int] = None
+_bcrypt_lock = threading.Lock()
+_rehash_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="bcrypt-rehash")
+
+
+def calibrate_bcrypt_rounds() -> int:
+    """
+    Pick the bcrypt cost for this instance.
+
+    Uses BCRYPT_ROUNDS as given if set (recommended when several instances
+    share the database); otherwise times a hash at the
+    minimum cost and picks the highest cost whose hash time stays within
+    BCRYPT_TARGET_MS (each extra round doubles the work), clamped to
+    [BCRYPT_MIN_ROUNDS, BCRYPT_MAX_ROUNDS].
+
+    Returns:
+        Selected bcrypt cost.
+    """
+    global _bcrypt_rounds
+    settings = get_settings()
+
+    with _bcrypt_lock:
+        if settings.bcrypt_rounds:
+            rounds = settings.bcrypt_rounds
+        else:
+            salt = bcrypt.gensalt(rounds=settings.bcrypt_min_rounds)
+            elapsed_ms = float("inf")
+            for _ in range(3):
+                start = time.perf_counter()
+                bcrypt.hashpw(b"calibration-password", salt)
+                elapsed_ms = min(elapsed_ms, (time.perf_counter() - start) * 1000)
+
+            extra = math.floor(math.log2(settings.bcrypt_target_ms / elapsed_ms))
+            rounds = settings.bcrypt_min_rounds + max(0, extra)
+            rounds = max(
+                settings.bcrypt_min_rounds, min(settings.bcrypt_max_rounds, rounds)
+            )
+            logger.info(
+                f"bcrypt cost {settings.bcrypt_min_rounds} takes {elapsed_ms:.0f}ms"
+            )
+
+        _bcrypt_rounds = rounds
+
+    logger.info(f"Using bcrypt cost {rounds}")
+    return rounds
+
+
+def get_bcrypt_rounds() -> int:
+    """Get the bcrypt cost, calibrating on first use."""
+    if _bcrypt_rounds is None:
+        return calibrate_bcrypt_rounds()
+    return _bcrypt_rounds
+
+
+def get_hash_rounds(password_hash: str) -> Optional[int]:
+    """
+    Get the cost a bcrypt hash was created with.
+
+    Args:
+        password_hash: Hash in the form $2b$12$<salt+hash>.
+
+    Returns:
+        Cost, or None if the hash is not in bcrypt format.
+    """
+    try:
+        return int(password_hash.split("$")[2])
+    except (IndexError, ValueError):
+        return None
+
+
+def hash_password(password: str, rounds: Optional[int] = None) -> str:
     """
     Hash a password using bcrypt.
 
     Args:
         password: Plain text password.
+        rounds: bcrypt cost (defaults to the calibrated cost).
 
     Returns:
         Hashed password string.
     """
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds=rounds or get_bcrypt_rounds())
     hashed = bcrypt.hashpw(password.encode("utf-8"), salt)
     return hashed.decode("utf-8")
 
@@ -47,6 +127,7 @@ def verify_password(password: str, password_hash: str) -> bool:
         return False
 
 
+@timed()
 def authenticate_user(username: str, password: str) -> Tuple[bool, Optional[str]]:
     """
     Authenticate a user for Gradio.
@@ -84,10 +165,19 @@ def authenticate_user(username: str, password: str) -> Tuple[bool, Optional[str]
                 logger.warning(f"Authentication failed: invalid password for '{username}'")
                 return False, "Invalid username or password"
 
+            # Read before commit, which expires loaded attributes
+            user_id = user.id
+            password_hash = user.password_hash
+
             # Update last login
             user.last_login = datetime.utcnow()
             session.commit()
 
+            # Only upgrade; lowering a cost would weaken the hash, and
+            # instances that calibrated differently would keep flipping it
+            if (get_hash_rounds(password_hash) or 0) < get_bcrypt_rounds():
+                _schedule_rehash(user_id, password, password_hash)
+
             logger.info(f"User '{username}' authenticated successfully")
             return True, None
 
@@ -96,6 +186,37 @@ def authenticate_user(username: str, password: str) -> Tuple[bool, Optional[str]
         return False, "Authentication service unavailable"
 
 
+def _schedule_rehash(user_id: int, password: str, old_hash: str) -> None:
+    """Re-hash a password at the current cost without delaying login."""
+    _rehash_executor.submit(_rehash_password, user_id, password, old_hash)
+
+
+def _rehash_password(user_id: int, password: str, old_hash: str) -> None:
+    """
+    Replace a password hash, unless it was changed in the meantime.
+
+    Args:
+        user_id: User to update.
+        password: Verified plain text password.
+        old_hash: Hash that was verified at login.
+    """
+    try:
+        new_hash = hash_password(password)
+        with get_db_session() as session:
+            updated = (
+                session.query(User)
+                .filter(User.id == user_id, User.password_hash == old_hash)
+                .update({User.password_hash: new_hash}, synchronize_session=False)
+            )
+        if updated:
+            logger.info(
+                f"Password hash for user {user_id} upgraded from cost "
+                f"{get_hash_rounds(old_hash)} to {get_hash_rounds(new_hash)}"
+            )
+    except Exception as e:
+        logger.error(f"Password rehash error for user {user_id}: {e}")
+
+
 def gradio_auth(username: str, password: str) -> bool:
     """
     Gradio-compatible authentication function.
@@ -135,32 +256,20 @@ def create_user(
     if len(password) < 8:
         return None, "Password must be at least 8 characters"
 
+    if len(password.encode("utf-8")) > MAX_PASSWORD_BYTES:
+        return None, f"Password must be at most {MAX_PASSWORD_BYTES} bytes"
+
     try:
+        # Hash before touching the database so no connection is held meanwhile
+        password_hash = hash_password(password)
+
+        # Rely on the unique constraints instead of SELECT-then-INSERT,
+        # which races with concurrent registrations
         with get_db_session() as session:
-            # Check if username exists
-            existing = (
-                session.query(User)
-                .filter(User.username == username)
-                .first()
-            )
-            if existing:
-                return None, "Username already exists"
-
-            # Check if email exists
-            if email:
-                existing_email = (
-                    session.query(User)
-                    .filter(User.email == email)
-                    .first()
-                )
-                if existing_email:
-                    return None, "Email already exists"
-
-            # Create user
             user = User(
                 username=username,
                 email=email,
-                password_hash=hash_password(password),
+                password_hash=password_hash,
                 is_admin=is_admin,
             )
             session.add(user)
@@ -170,12 +279,57 @@ def create_user(
             logger.info(f"User '{username}' created successfully")
             return user, None
 
+    except IntegrityError as e:
+        error = conflict_error(e)
+        logger.warning(f"User '{username}' not created: {error}")
+        return None, error
     except Exception as e:
         logger.error(f"Error creating user: {e}")
         return None, "Failed to create user"
 
 
+def conflict_error(error: IntegrityError) -> str:
+    """
+    Map a unique-constraint violation on users to an error message.
+
+    Args:
+        error: IntegrityError raised by the INSERT.
+
+    Returns:
+        Human-readable error message.
+    """
+    # PostgreSQL reports e.g. 'DETAIL:  Key (email)=(a@b.c) already exists.'
+    detail = str(error.orig).lower()
+    if "key (email)" in detail:
+        return "Email already exists"
+    if "key (username)" in detail:
+        return "Username already exists"
+    return "Username or email already exists"
+
+
 def get_user_by_username(username: str) -> Optional[User]:
     """Get user by username."""
     with get_db_session() as session:
         return session.query(User).filter(User.username == username).first()
+
+
+def is_admin_user(username: Optional[str]) -> bool:
+    """
+    Check whether a user is an active admin.
+
+    Args:
+        username: Username to check.
+
+    Returns:
+        True if the user exists, is active and has admin privileges.
+    """
+    if not username:
+        return False
+
+    try:
+        with get_db_session() as session:
+            user = session.query(User).filter(User.username == username).first()
+            return bool(user and user.is_active and user.is_admin)
+    except Exception as e:
+        logger.error(f"Admin check error: {e}")
+        return False
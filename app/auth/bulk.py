@@ -0,0 +1,310 @@
+"""
+Bulk user provisioning.
+
+Usage:
+    python -m app.auth.bulk users.csv --report failures.csv
+
+The CSV must have a header with "username" and "password" columns and may
+include "email" and "is_admin". Passwords are hashed across a process pool,
+conflicts with existing users are found with one set-based query per batch,
+and rows are inserted with INSERT ... ON CONFLICT DO NOTHING so concurrent
+registrations cannot make the import fail. A database error fails only the
+rows of its batch, so the report lists every row that still needs importing.
+"""
+
+import argparse
+import csv
+import logging
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from functools import partial
+from pathlib import Path
+from typing import Iterable, List, Optional, Set
+
+from sqlalchemy import or_, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.auth.auth_handler import MAX_PASSWORD_BYTES, get_bcrypt_rounds, hash_password
+from app.auth.database import get_db_session
+from app.auth.models import User
+
+logger = logging.getLogger(__name__)
+
+TRUE_VALUES = {"1", "true", "yes", "y"}
+MAX_USERNAME_LENGTH = User.__table__.c.username.type.length
+MAX_EMAIL_LENGTH = User.__table__.c.email.type.length
+
+
+@dataclass
+class BulkUser:
+    """User row to import."""
+
+    row: int
+    username: str
+    password: str
+    email: Optional[str] = None
+    is_admin: bool = False
+
+
+@dataclass
+class BulkFailure:
+    """Row that could not be imported."""
+
+    row: int
+    username: str
+    error: str
+
+
+@dataclass
+class BulkResult:
+    """Outcome of a bulk import."""
+
+    created: int = 0
+    failures: List[BulkFailure] = field(default_factory=list)
+
+
+def read_users_csv(path: Path) -> List[BulkUser]:
+    """
+    Read users from a CSV file.
+
+    Args:
+        path: CSV path with username, password, email, is_admin columns.
+
+    Returns:
+        List of users; row numbers count the header as row 1.
+    """
+    with path.open(encoding="utf-8", newline="") as f:
+        return [
+            BulkUser(
+                row=row_no,
+                username=(record.get("username") or "").strip(),
+                password=record.get("password") or "",
+                email=(record.get("email") or "").strip() or None,
+                is_admin=(record.get("is_admin") or "").strip().lower() in TRUE_VALUES,
+            )
+            for row_no, record in enumerate(csv.DictReader(f), start=2)
+        ]
+
+
+def _validate(users: Iterable[BulkUser], result: BulkResult) -> List[BulkUser]:
+    """Drop invalid rows and duplicates within the input itself."""
+    valid: List[BulkUser] = []
+    seen_usernames: Set[str] = set()
+    seen_emails: Set[str] = set()
+
+    for user in users:
+        error = None
+        if not user.username or not user.password:
+            error = "Username and password are required"
+        elif len(user.password) < 8:
+            error = "Password must be at least 8 characters"
+        elif len(user.password.encode("utf-8")) > MAX_PASSWORD_BYTES:
+            error = f"Password must be at most {MAX_PASSWORD_BYTES} bytes"
+        elif len(user.username) > MAX_USERNAME_LENGTH:
+            error = f"Username must be at most {MAX_USERNAME_LENGTH} characters"
+        elif user.email and len(user.email) > MAX_EMAIL_LENGTH:
+            error = f"Email must be at most {MAX_EMAIL_LENGTH} characters"
+        elif user.username in seen_usernames:
+            error = "Duplicate username in input"
+        elif user.email and user.email in seen_emails:
+            error = "Duplicate email in input"
+
+        if error:
+            result.failures.append(BulkFailure(user.row, user.username, error))
+            continue
+
+        seen_usernames.add(user.username)
+        if user.email:
+            seen_emails.add(user.email)
+        valid.append(user)
+
+    return valid
+
+
+def _drop_existing(users: List[BulkUser], result: BulkResult) -> List[BulkUser]:
+    """Drop rows that conflict with existing users using a single query."""
+    usernames = [u.username for u in users]
+    emails = [u.email for u in users if u.email]
+
+    with get_db_session() as session:
+        rows = session.execute(
+            select(User.username, User.email).where(
+                or_(User.username.in_(usernames), User.email.in_(emails))
+            )
+        ).all()
+
+    existing_usernames = {row.username for row in rows}
+    existing_emails = {row.email for row in rows if row.email}
+
+    remaining: List[BulkUser] = []
+    for user in users:
+        if user.username in existing_usernames:
+            result.failures.append(
+                BulkFailure(user.row, user.username, "Username already exists")
+            )
+        elif user.email and user.email in existing_emails:
+            result.failures.append(
+                BulkFailure(user.row, user.username, "Email already exists")
+            )
+        else:
+            remaining.append(user)
+
+    return remaining
+
+
+def _hash_or_none(password: str, rounds: int) -> Optional[str]:
+    """Hash a password in a worker process, returning None on failure."""
+    try:
+        return hash_password(password, rounds=rounds)
+    except Exception:
+        return None
+
+
+def _insert_batch(
+    users: List[BulkUser], password_hashes: List[str], result: BulkResult
+) -> None:
+    """Insert a batch, reporting rows lost to concurrent inserts."""
+    params = [
+        {
+            "username": user.username,
+            "email": user.email,
+            "password_hash": password_hash,
+            "is_active": True,
+            "is_admin": user.is_admin,
+        }
+        for user, password_hash in zip(users, password_hashes)
+    ]
+
+    with get_db_session() as session:
+        inserted = set(
+            session.scalars(
+                insert(User).on_conflict_do_nothing().returning(User.username),
+                params,
+            )
+        )
+
+    result.created += len(inserted)
+    for user in users:
+        if user.username not in inserted:
+            result.failures.append(
+                BulkFailure(user.row, user.username, "Username or email already exists")
+            )
+
+
+def bulk_create_users(
+    users: Iterable[BulkUser],
+    batch_size: int = 500,
+    workers: Optional[int] = None,
+) -> BulkResult:
+    """
+    Create many users at once.
+
+    Args:
+        users: Users to create.
+        batch_size: Rows per conflict check and INSERT statement.
+        workers: Processes used for password hashing (defaults to CPU count).
+
+    Returns:
+        Number of created users and per-row failures.
+    """
+    result = BulkResult()
+    valid = _validate(users, result)
+
+    # Calibrate once here rather than in every worker process
+    hash_with_cost = partial(_hash_or_none, rounds=get_bcrypt_rounds())
+
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        for start in range(0, len(valid), batch_size):
+            # Rows of this batch that have no outcome yet
+            pending = valid[start : start + batch_size]
+            try:
+                pending = _drop_existing(pending, result)
+                if not pending:
+                    continue
+
+                hashed = list(
+                    executor.map(
+                        hash_with_cost, [u.password for u in pending], chunksize=8
+                    )
+                )
+
+                insertable = []
+                password_hashes = []
+                for user, password_hash in zip(pending, hashed):
+                    if password_hash is None:
+                        result.failures.append(
+                            BulkFailure(
+                                user.row, user.username, "Failed to hash password"
+                            )
+                        )
+                    else:
+                        insertable.append(user)
+                        password_hashes.append(password_hash)
+
+                pending = insertable
+                if insertable:
+                    _insert_batch(insertable, password_hashes, result)
+            except SQLAlchemyError as e:
+                # Fail this batch only; earlier batches are already committed
+                error = f"Database error: {str(e).splitlines()[0]}"
+                logger.error(f"Batch starting at row {pending[0].row} failed: {error}")
+                result.failures.extend(
+                    BulkFailure(user.row, user.username, error) for user in pending
+                )
+
+            logger.info(
+                f"Imported {min(start + batch_size, len(valid))}/{len(valid)} rows"
+            )
+
+    result.failures.sort(key=lambda failure: failure.row)
+    return result
+
+
+def write_report(path: Path, failures: List[BulkFailure]) -> None:
+    """Write per-row failures to a CSV file."""
+    with path.open("w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["row", "username", "error"])
+        for failure in failures:
+            writer.writerow([failure.row, failure.username, failure.error])
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Bulk import users from CSV.")
+    parser.add_argument("input", type=Path, help="CSV with users to import")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument(
+        "--report", type=Path, default=None, help="CSV to write per-row failures to"
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run the bulk import CLI."""
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+        handlers=[logging.StreamHandler(sys.stderr)],
+    )
+    args = parse_args(argv)
+
+    users = read_users_csv(args.input)
+    result = bulk_create_users(users, batch_size=args.batch_size, workers=args.workers)
+
+    logger.info(f"Created {result.created} users, {len(result.failures)} failed")
+    for failure in result.failures:
+        logger.warning(f"Row {failure.row} ({failure.username}): {failure.error}")
+
+    if args.report:
+        write_report(args.report, result.failures)
+
+    return 1 if result.failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -93,7 +93,7 @@ def init_database() -> None:
 def _create_default_admin() -> None:
     """Create default admin user if it doesn't exist."""
     import os
-    import bcrypt
+    from app.auth.auth_handler import hash_password
     from app.auth.models import User
 
     admin_username = os.environ.get("ADMIN_USERNAME", "admin")
@@ -107,13 +107,10 @@ def _create_default_admin() -> None:
     with get_db_session() as session:
         admin = session.query(User).filter(User.username == admin_username).first()
         if admin is None:
-            password_hash = bcrypt.hashpw(
-                admin_password.encode("utf-8"), bcrypt.gensalt()
-            ).decode("utf-8")
             admin = User(
                 username=admin_username,
                 email=admin_email,
-                password_hash=password_hash,
+                password_hash=hash_password(admin_password),
                 is_active=True,
                 is_admin=True,
             )
@@ -1,8 +1,17 @@
-"""Database models for authentication."""
+"""Database models for authentication and usage accounting."""
 
 from datetime import datetime
 
-from sqlalchemy import Boolean, Column, DateTime, Integer, String
+from sqlalchemy import (
+    BigInteger,
+    Boolean,
+    Column,
+    Date,
+    DateTime,
+    Integer,
+    String,
+    UniqueConstraint,
+)
 from sqlalchemy.orm import DeclarativeBase
 
 
@@ -31,3 +40,29 @@ class User(Base):
 
     def __repr__(self) -> str:
         return f"<User(id={self.id}, username='{self.username}')>"
+
+
+class Usage(Base):
+    """Daily Bedrock token usage per user and model."""
+
+    __tablename__ = "usage"
+    __table_args__ = (
+        UniqueConstraint("username", "model_id", "day", name="uq_usage_user_model_day"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    username = Column(String(50), nullable=False, index=True)
+    model_id = Column(String(255), nullable=False)
+    day = Column(Date, nullable=False)
+    input_tokens = Column(BigInteger, default=0, nullable=False)
+    output_tokens = Column(BigInteger, default=0, nullable=False)
+    request_count = Column(Integer, default=0, nullable=False)
+    updated_at = Column(
+        DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False
+    )
+
+    def __repr__(self) -> str:
+        return (
+            f"<Usage(username='{self.username}', model_id='{self.model_id}', "
+            f"day={self.day})>"
+        )
@@ -1,5 +1,15 @@
 """Chat module with AWS Bedrock integration."""
 
-from app.chat.bedrock_client import BedrockChatClient, get_chat_client
+from app.chat.bedrock_client import (
+    BedrockChatClient,
+    ChatClientRegistry,
+    get_chat_client,
+    get_client_registry,
+)
 
-__all__ = ["BedrockChatClient", "get_chat_client"]
+__all__ = [
+    "BedrockChatClient",
+    "ChatClientRegistry",
+    "get_chat_client",
+    "get_client_registry",
+]
@@ -0,0 +1,397 @@
+"""
+Offline batch inference over BedrockChatClient.
+
+Usage:
+    python -m app.chat.batch prompts.jsonl results.jsonl --concurrency 8
+
+Each input line is a JSON object with a "prompt" and optional "id" and
+"history" (list of {role, content} dicts). Results are appended to the
+output file as they complete, so an interrupted run can be resumed by
+re-running the same command: ids that already have a successful result
+are skipped.
+"""
+
+import argparse
+import json
+import logging
+import random
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set
+
+from botocore.exceptions import ClientError
+
+from app.chat.bedrock_client import BedrockChatClient, ChatHistory
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_ERROR_CODES = {
+    "ThrottlingException",
+    "TooManyRequestsException",
+    "ServiceUnavailableException",
+    "ModelNotReadyException",
+}
+
+
+@dataclass
+class BatchItem:
+    """Single prompt to run."""
+
+    id: str
+    prompt: str = ""
+    history: Optional[ChatHistory] = None
+    error: Optional[str] = None
+
+
+@dataclass
+class BatchResult:
+    """Outcome of a single prompt."""
+
+    id: str
+    response: Optional[str] = None
+    error: Optional[str] = None
+    latency_ms: float = 0.0
+    input_tokens: Optional[int] = None
+    output_tokens: Optional[int] = None
+    attempts: int = 0
+
+
+@dataclass
+class BatchStats:
+    """Aggregate counters for a batch run."""
+
+    succeeded: int = 0
+    failed: int = 0
+    skipped: int = 0
+    throttled: int = 0
+    errors: List[str] = field(default_factory=list)
+
+
+class AdaptiveBackoff:
+    """
+    Shared backoff across workers.
+
+    A throttling error doubles the delay and pauses every worker until it
+    has elapsed; each success halves it again.
+    """
+
+    def __init__(self, base_delay: float = 1.0, max_delay: float = 60.0):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._delay = 0.0
+        self._resume_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def delay(self) -> float:
+        """Current backoff delay in seconds."""
+        return self._delay
+
+    def wait(self) -> None:
+        """Block until the shared pause has elapsed."""
+        while True:
+            with self._lock:
+                remaining = self._resume_at - time.monotonic()
+            if remaining <= 0:
+                return
+            time.sleep(remaining)
+
+    def on_throttle(self) -> None:
+        """Increase the delay and pause all workers."""
+        with self._lock:
+            self._delay = min(self.max_delay, max(self.base_delay, self._delay * 2))
+            pause = self._delay * random.uniform(0.5, 1.0)
+            self._resume_at = max(self._resume_at, time.monotonic() + pause)
+
+    def on_success(self) -> None:
+        """Decay the delay after a successful call."""
+        with self._lock:
+            self._delay = self._delay / 2 if self._delay > self.base_delay else 0.0
+
+
+def is_retryable(error: Exception) -> bool:
+    """Check whether an error is a Bedrock throttling/availability error."""
+    if isinstance(error, ClientError):
+        return error.response.get("Error", {}).get("Code", "") in RETRYABLE_ERROR_CODES
+
+    # langchain_aws wraps boto errors in ValueError, keeping the code in the message
+    message = str(error)
+    return any(code in message for code in RETRYABLE_ERROR_CODES)
+
+
+def read_items(path: Path) -> Iterator[BatchItem]:
+    """
+    Read prompts from a JSONL file.
+
+    Args:
+        path: Input JSONL path.
+
+    Yields:
+        Batch items; the line number is used when "id" is missing. Lines
+        that cannot be parsed are yielded with `error` set.
+    """
+    with path.open(encoding="utf-8") as f:
+        for line_no, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield BatchItem(id=str(line_no), error=f"Invalid JSON: {e}")
+                continue
+
+            if not isinstance(record, dict):
+                yield BatchItem(id=str(line_no), error="Line is not a JSON object")
+                continue
+
+            item_id = str(record.get("id", line_no))
+            if not isinstance(record.get("prompt"), str):
+                yield BatchItem(id=item_id, error="Missing or non-string 'prompt'")
+                continue
+
+            yield BatchItem(
+                id=item_id,
+                prompt=record["prompt"],
+                history=record.get("history"),
+            )
+
+
+def read_completed_ids(path: Path) -> Set[str]:
+    """
+    Collect ids that already have a successful result.
+
+    Args:
+        path: Output JSONL path (may not exist yet).
+
+    Returns:
+        Set of completed item ids.
+    """
+    completed: Set[str] = set()
+    if not path.exists():
+        return completed
+
+    with path.open(encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # Partially written last line from an interrupted run
+                continue
+            if record.get("error") is None:
+                completed.add(str(record["id"]))
+            else:
+                completed.discard(str(record["id"]))
+
+    return completed
+
+
+def _usage_from_response(response: Any) -> Dict[str, Optional[int]]:
+    """Extract token counts from a LangChain response, if available."""
+    usage = getattr(response, "usage_metadata", None) or {}
+    if not usage:
+        usage = (getattr(response, "response_metadata", None) or {}).get("usage", {})
+
+    input_tokens = usage.get("input_tokens", usage.get("prompt_tokens"))
+    output_tokens = usage.get("output_tokens", usage.get("completion_tokens"))
+    return {"input_tokens": input_tokens, "output_tokens": output_tokens}
+
+
+def run_item(
+    client: BedrockChatClient,
+    item: BatchItem,
+    backoff: AdaptiveBackoff,
+    max_retries: int = 5,
+) -> BatchResult:
+    """
+    Run a single prompt, retrying on throttling.
+
+    Args:
+        client: Chat client to use.
+        item: Prompt to run.
+        backoff: Shared backoff controller.
+        max_retries: Retries allowed for retryable errors.
+
+    Returns:
+        Result with response or error, latency and token counts.
+    """
+    result = BatchResult(id=item.id)
+
+    while True:
+        backoff.wait()
+        result.attempts += 1
+        start = time.perf_counter()
+        try:
+            response = client.generate(item.prompt, item.history)
+        except Exception as e:
+            if is_retryable(e) and result.attempts <= max_retries:
+                logger.warning(f"Item {item.id} throttled (attempt {result.attempts})")
+                backoff.on_throttle()
+                continue
+            result.latency_ms = (time.perf_counter() - start) * 1000
+            result.error = str(e)
+            return result
+
+        result.latency_ms = (time.perf_counter() - start) * 1000
+        backoff.on_success()
+        result.response = response.content
+        usage = _usage_from_response(response)
+        result.input_tokens = usage["input_tokens"]
+        result.output_tokens = usage["output_tokens"]
+        return result
+
+
+def run_batch(
+    client: BedrockChatClient,
+    input_path: Path,
+    output_path: Path,
+    concurrency: int = 4,
+    max_retries: int = 5,
+    backoff: Optional[AdaptiveBackoff] = None,
+) -> BatchStats:
+    """
+    Run every prompt in input_path and append results to output_path.
+
+    At most `concurrency` prompts are in flight at once. Items that
+    already have a successful result in output_path are skipped.
+
+    Args:
+        client: Chat client to use.
+        input_path: Input JSONL with prompts.
+        output_path: Output JSONL for results (appended to).
+        concurrency: Maximum concurrent requests.
+        max_retries: Retries allowed per item for retryable errors.
+        backoff: Shared backoff controller.
+
+    Returns:
+        Aggregate statistics for the run.
+    """
+    backoff = backoff or AdaptiveBackoff()
+    completed = read_completed_ids(output_path)
+    stats = BatchStats()
+
+    def write(result: BatchResult) -> None:
+        out.write(json.dumps(asdict(result), ensure_ascii=False) + "\n")
+        out.flush()
+        if result.error is None:
+            stats.succeeded += 1
+        else:
+            stats.failed += 1
+            stats.errors.append(f"{result.id}: {result.error}")
+        stats.throttled += max(0, result.attempts - 1)
+
+    def record(future: Future, item_id: str) -> None:
+        try:
+            result: BatchResult = future.result()
+        except Exception as e:
+            result = BatchResult(id=item_id, error=str(e))
+        write(result)
+
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with output_path.open("a", encoding="utf-8") as out, ThreadPoolExecutor(
+        max_workers=concurrency
+    ) as executor:
+        pending: Dict[Future, str] = {}
+
+        try:
+            for item in read_items(input_path):
+                if item.id in completed:
+                    stats.skipped += 1
+                    continue
+
+                if item.error is not None:
+                    write(BatchResult(id=item.id, error=item.error))
+                    continue
+
+                if len(pending) >= concurrency:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        record(future, pending.pop(future))
+
+                future = executor.submit(run_item, client, item, backoff, max_retries)
+                pending[future] = item.id
+        finally:
+            # Checkpoint calls that are already paid for, even if reading
+            # the input failed or the run was interrupted
+            for future in wait(pending).done:
+                record(future, pending[future])
+
+    return stats
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Run a JSONL file of prompts through Bedrock."
+    )
+    parser.add_argument("input", type=Path, help="Input JSONL with prompts")
+    parser.add_argument("output", type=Path, help="Output JSONL for results")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--max-retries", type=int, default=5)
+    parser.add_argument("--model-id", default=None)
+    parser.add_argument("--max-tokens", type=int, default=None)
+    parser.add_argument("--temperature", type=float, default=None)
+    parser.add_argument(
+        "--fake",
+        action="store_true",
+        help="Use a local fake Bedrock model instead of AWS",
+    )
+    parser.add_argument(
+        "--fake-throttle-rate",
+        type=float,
+        default=0.0,
+        help="Fraction of fake requests that fail with ThrottlingException",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run the batch CLI."""
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+        handlers=[logging.StreamHandler(sys.stderr)],
+    )
+    args = parse_args(argv)
+
+    llm = None
+    if args.fake:
+        from app.chat.fake import FakeBedrockChatModel
+
+        llm = FakeBedrockChatModel(throttle_rate=args.fake_throttle_rate)
+
+    client = BedrockChatClient(
+        model_id=args.model_id,
+        max_tokens=args.max_tokens,
+        temperature=args.temperature,
+        llm=llm,
+    )
+
+    start = time.perf_counter()
+    stats = run_batch(
+        client,
+        args.input,
+        args.output,
+        concurrency=args.concurrency,
+        max_retries=args.max_retries,
+    )
+    elapsed = time.perf_counter() - start
+
+    logger.info(
+        f"Batch finished in {elapsed:.1f}s: {stats.succeeded} succeeded, "
+        f"{stats.failed} failed, {stats.skipped} skipped, "
+        f"{stats.throttled} throttled retries"
+    )
+    for error in stats.errors:
+        logger.error(f"Failed item {error}")
+
+    return 1 if stats.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,12 +1,20 @@
 """AWS Bedrock chat client using LangChain."""
 
 import logging
-from typing import Any, Dict, Generator, List, Optional
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Generator, List, Optional, Tuple
 
+import boto3
+from botocore.config import Config
 from langchain_aws import ChatBedrock
+from langchain_core.language_models import BaseChatModel
 from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
 
+from app.chat.usage import estimate_tokens, get_usage_tracker
 from app.config import get_settings
+from app.utils.profiling import timed
 
 logger = logging.getLogger(__name__)
 
@@ -23,6 +31,9 @@ class BedrockChatClient:
         max_tokens: Optional[int] = None,
         temperature: Optional[float] = None,
         region: Optional[str] = None,
+        llm: Optional[BaseChatModel] = None,
+        runtime_client: Optional[Any] = None,
+        control_client: Optional[Any] = None,
     ):
         """
         Initialize Bedrock chat client.
@@ -32,42 +43,69 @@ class BedrockChatClient:
             max_tokens: Maximum tokens in response.
             temperature: Model temperature for randomness.
             region: AWS region.
+            llm: Pre-built chat model to use instead of ChatBedrock
+                (e.g. a local fake for offline runs).
+            runtime_client: Shared boto3 bedrock-runtime client. A new one
+                is created by ChatBedrock if not provided.
+            control_client: Shared boto3 bedrock (control plane) client.
+                A new one is created by ChatBedrock if not provided.
         """
         settings = get_settings()
 
         self.model_id = model_id or settings.bedrock_model_id
         self.max_tokens = max_tokens or settings.bedrock_max_tokens
-        self.temperature = temperature or settings.bedrock_temperature
+        self.temperature = (
+            temperature if temperature is not None else settings.bedrock_temperature
+        )
         self.region = region or settings.aws_region
 
-        self._client: Optional[ChatBedrock] = None
+        self._client: Optional[BaseChatModel] = llm
+        self._runtime_client = runtime_client
+        self._control_client = control_client
+        self._client_lock = threading.Lock()
         self._system_message = (
             "You are a helpful AI assistant. Provide clear, accurate, "
             "and concise responses to user questions."
         )
 
     @property
-    def client(self) -> ChatBedrock:
+    def client(self) -> BaseChatModel:
         """Get or create LangChain ChatBedrock client."""
         if self._client is None:
-            self._client = ChatBedrock(
-                model_id=self.model_id,
-                region_name=self.region,
-                model_kwargs={
-                    "max_tokens": self.max_tokens,
-                    "temperature": self.temperature,
-                },
-            )
-            logger.info(f"Bedrock client initialized with model: {self.model_id}")
+            # Registry clients are shared across request threads
+            with self._client_lock:
+                if self._client is None:
+                    self._client = ChatBedrock(
+                        model_id=self.model_id,
+                        region_name=self.region,
+                        client=self._runtime_client,
+                        bedrock_client=self._control_client,
+                        model_kwargs={
+                            "max_tokens": self.max_tokens,
+                            "temperature": self.temperature,
+                        },
+                    )
+                    logger.info(
+                        f"Bedrock client initialized with model: {self.model_id}"
+                    )
 
         return self._client
 
     def set_system_message(self, message: str) -> None:
-        """Set the system message for the conversation."""
+        """
+        Set the default system message for the conversation.
+
+        This is shared by every caller of this client; pass system_message
+        to chat()/chat_stream() for per-session prompts instead.
+        """
         self._system_message = message
 
+    @timed()
     def _build_messages(
-        self, user_message: str, history: Optional[ChatHistory] = None
+        self,
+        user_message: str,
+        history: Optional[ChatHistory] = None,
+        system_message: Optional[str] = None,
     ) -> List[BaseMessage]:
         """
         Build message list from history and new user message.
@@ -75,6 +113,7 @@ class BedrockChatClient:
         Args:
             user_message: Current user message.
             history: Chat history as list of {role, content} dicts (Gradio 5+ format).
+            system_message: System prompt overriding the client default.
 
         Returns:
             List of LangChain message objects.
@@ -82,8 +121,10 @@ class BedrockChatClient:
         messages: List[BaseMessage] = []
 
         # Add system message
-        if self._system_message:
-            messages.append(SystemMessage(content=self._system_message))
+        if system_message is None:
+            system_message = self._system_message
+        if system_message:
+            messages.append(SystemMessage(content=system_message))
 
         # Add history (Gradio 5+ format: list of {role, content} dicts)
         if history:
@@ -101,8 +142,66 @@ class BedrockChatClient:
 
         return messages
 
+    def generate(
+        self,
+        user_message: str,
+        history: Optional[ChatHistory] = None,
+        system_message: Optional[str] = None,
+    ) -> AIMessage:
+        """
+        Send a message and return the raw model response.
+
+        Unlike chat(), errors are raised to the caller so they can be
+        retried or recorded.
+
+        Args:
+            user_message: User's message.
+            history: Chat history as list of {role, content} dicts.
+            system_message: System prompt overriding the client default.
+
+        Returns:
+            LangChain AIMessage including response and usage metadata.
+        """
+        messages = self._build_messages(user_message, history, system_message)
+        return self.client.invoke(messages)
+
+    def _record_usage(
+        self,
+        username: Optional[str],
+        messages: List[BaseMessage],
+        response_text: str,
+        usage: Optional[Dict[str, Any]],
+    ) -> None:
+        """
+        Record token usage for a user, estimating it if Bedrock didn't report it.
+
+        Args:
+            username: User who made the request (nothing is recorded if None).
+            messages: Messages sent to the model.
+            response_text: Full model response.
+            usage: LangChain usage metadata from the response, if any.
+        """
+        settings = get_settings()
+        if not username or not settings.usage_tracking_enabled:
+            return
+
+        if usage:
+            input_tokens = usage.get("input_tokens", 0)
+            output_tokens = usage.get("output_tokens", 0)
+        else:
+            input_tokens = sum(estimate_tokens(str(m.content)) for m in messages)
+            output_tokens = estimate_tokens(response_text)
+
+        get_usage_tracker().record(
+            username, self.model_id, input_tokens, output_tokens
+        )
+
     def chat(
-        self, user_message: str, history: Optional[ChatHistory] = None
+        self,
+        user_message: str,
+        history: Optional[ChatHistory] = None,
+        system_message: Optional[str] = None,
+        username: Optional[str] = None,
     ) -> str:
         """
         Send a message and get a response.
@@ -110,6 +209,8 @@ class BedrockChatClient:
         Args:
             user_message: User's message.
             history: Chat history as list of {role, content} dicts.
+            system_message: System prompt overriding the client default.
+            username: User to record token usage for.
 
         Returns:
             Assistant's response.
@@ -118,16 +219,24 @@ class BedrockChatClient:
             return "Please enter a message."
 
         try:
-            messages = self._build_messages(user_message, history)
+            messages = self._build_messages(user_message, history, system_message)
             response = self.client.invoke(messages)
+            self._record_usage(
+                username, messages, response.content, response.usage_metadata
+            )
             return response.content
 
         except Exception as e:
             logger.error(f"Chat error: {e}")
             return f"Sorry, I encountered an error: {str(e)}"
 
+    @timed()
     def chat_stream(
-        self, user_message: str, history: Optional[ChatHistory] = None
+        self,
+        user_message: str,
+        history: Optional[ChatHistory] = None,
+        system_message: Optional[str] = None,
+        username: Optional[str] = None,
     ) -> Generator[str, None, None]:
         """
         Send a message and stream the response.
@@ -135,6 +244,8 @@ class BedrockChatClient:
         Args:
             user_message: User's message.
             history: Chat history as list of {role, content} dicts.
+            system_message: System prompt overriding the client default.
+            username: User to record token usage for.
 
         Yields:
             Chunks of the assistant's response.
@@ -143,29 +254,220 @@ class BedrockChatClient:
             yield "Please enter a message."
             return
 
+        start = time.perf_counter()
+        ttft_ms = 0.0
+        messages: List[BaseMessage] = []
+        full_response = ""
+        usage: Dict[str, Any] = {}
+        streamed = False
+
         try:
-            messages = self._build_messages(user_message, history)
+            messages = self._build_messages(user_message, history, system_message)
 
-            full_response = ""
             for chunk in self.client.stream(messages):
+                streamed = True
+                if chunk.usage_metadata:
+                    for key, value in chunk.usage_metadata.items():
+                        if isinstance(value, int):
+                            usage[key] = usage.get(key, 0) + value
                 if chunk.content:
+                    if not full_response:
+                        ttft_ms = (time.perf_counter() - start) * 1000
                     full_response += chunk.content
                     yield full_response
 
+            # Sizes and timings only (no content); parsed by app.perf.capture
+            history = history or []
+            history_chars = sum(len(str(m.get("content", ""))) for m in history)
+            logger.info(
+                f"Chat turn completed for '{username}': "
+                f"message_chars={len(user_message)} "
+                f"history_messages={len(history)} "
+                f"history_chars={history_chars} "
+                f"output_chars={len(full_response)} "
+                f"ttft_ms={ttft_ms:.0f} "
+                f"total_ms={(time.perf_counter() - start) * 1000:.0f}"
+            )
+
         except Exception as e:
             logger.error(f"Chat stream error: {e}")
             yield f"Sorry, I encountered an error: {str(e)}"
 
+        finally:
+            # Also runs when the stream errors mid-way or the consumer stops
+            # it early (Stop button, disconnect); tokens so far are billed
+            if streamed:
+                self._record_usage(username, messages, full_response, usage)
+
+
+# Key identifying a client configuration: (model_id, temperature, max_tokens)
+ClientKey = Tuple[str, float, int]
+
+
+class ChatClientRegistry:
+    """
+    LRU cache of chat clients keyed on model configuration.
+
+    All clients share one pooled bedrock-runtime transport, so a new
+    configuration only costs a lightweight ChatBedrock wrapper.
+    """
+
+    def __init__(
+        self, max_size: Optional[int] = None, llm: Optional[BaseChatModel] = None
+    ):
+        """
+        Initialize client registry.
+
+        Args:
+            max_size: Maximum number of cached clients.
+            llm: Chat model shared by all clients instead of ChatBedrock
+                (e.g. a local fake for replay runs).
+        """
+        settings = get_settings()
+
+        self.max_size = max_size or settings.bedrock_client_cache_size
+        self.llm = llm
+        self._clients: "OrderedDict[ClientKey, BedrockChatClient]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _make_key(
+        self,
+        model_id: Optional[str],
+        temperature: Optional[float],
+        max_tokens: Optional[int],
+    ) -> ClientKey:
+        settings = get_settings()
+        return (
+            model_id or settings.bedrock_model_id,
+            temperature if temperature is not None else settings.bedrock_temperature,
+            max_tokens or settings.bedrock_max_tokens,
+        )
+
+    def get(
+        self,
+        model_id: Optional[str] = None,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+    ) -> BedrockChatClient:
+        """
+        Get or create a client for the given configuration.
+
+        Args:
+            model_id: Bedrock model ID.
+            temperature: Model temperature for randomness.
+            max_tokens: Maximum tokens in response.
+
+        Returns:
+            Cached chat client.
+        """
+        key = self._make_key(model_id, temperature, max_tokens)
+
+        with self._lock:
+            client = self._clients.get(key)
+            if client is not None:
+                self._clients.move_to_end(key)
+                return client
+
+            client = BedrockChatClient(
+                model_id=key[0],
+                temperature=key[1],
+                max_tokens=key[2],
+                llm=self.llm,
+                runtime_client=None if self.llm else get_bedrock_runtime(),
+                control_client=None if self.llm else get_bedrock_control(),
+            )
+            self._clients[key] = client
+
+            if len(self._clients) > self.max_size:
+                evicted, _ = self._clients.popitem(last=False)
+                logger.debug(f"Evicted chat client {evicted}")
+
+            return client
+
+    def clear(self) -> None:
+        """Drop all cached clients."""
+        with self._lock:
+            self._clients.clear()
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+
+# Global shared transport and registry
+_bedrock_runtime: Optional[Any] = None
+_bedrock_control: Optional[Any] = None
+_bedrock_runtime_lock = threading.Lock()
+_client_registry: Optional[ChatClientRegistry] = None
+
+
+def get_bedrock_runtime() -> Any:
+    """Get or create the shared, connection-pooled bedrock-runtime client."""
+    global _bedrock_runtime
+
+    with _bedrock_runtime_lock:
+        if _bedrock_runtime is None:
+            settings = get_settings()
+            _bedrock_runtime = boto3.client(
+                service_name="bedrock-runtime",
+                region_name=settings.aws_region,
+                config=Config(
+                    max_pool_connections=settings.bedrock_max_pool_connections
+                ),
+            )
+            logger.info("Bedrock runtime client created")
+
+    return _bedrock_runtime
+
+
+def get_bedrock_control() -> Any:
+    """Get or create the shared bedrock control-plane client used by ChatBedrock."""
+    global _bedrock_control
+
+    with _bedrock_runtime_lock:
+        if _bedrock_control is None:
+            settings = get_settings()
+            _bedrock_control = boto3.client(
+                service_name="bedrock",
+                region_name=settings.aws_region,
+            )
+            logger.info("Bedrock control client created")
+
+    return _bedrock_control
+
+
+def get_client_registry() -> ChatClientRegistry:
+    """Get or create global client registry."""
+    global _client_registry
+
+    if _client_registry is None:
+        _client_registry = ChatClientRegistry()
+
+    return _client_registry
+
+
+def set_client_registry(registry: ChatClientRegistry) -> None:
+    """Replace the global client registry."""
+    global _client_registry
+    _client_registry = registry
 
-# Global client instance
-_chat_client: Optional[BedrockChatClient] = None
 
+def get_chat_client(
+    model_id: Optional[str] = None,
+    temperature: Optional[float] = None,
+    max_tokens: Optional[int] = None,
+) -> BedrockChatClient:
+    """
+    Get a chat client for the given configuration.
 
-def get_chat_client() -> BedrockChatClient:
-    """Get or create global chat client instance."""
-    global _chat_client
+    Omitted values fall back to settings, so get_chat_client() returns the
+    default client.
 
-    if _chat_client is None:
-        _chat_client = BedrockChatClient()
+    Args:
+        model_id: Bedrock model ID.
+        temperature: Model temperature for randomness.
+        max_tokens: Maximum tokens in response.
 
-    return _chat_client
+    Returns:
+        Cached chat client from the global registry.
+    """
+    return get_client_registry().get(model_id, temperature, max_tokens)
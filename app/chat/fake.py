@@ -0,0 +1,103 @@
+"""Local fake Bedrock chat model for offline runs and testing."""
+
+import random
+import threading
+import time
+from typing import Any, Iterator, List, Optional
+
+from botocore.exceptions import ClientError
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import PrivateAttr
+
+from app.chat.usage import estimate_tokens
+
+
+class FakeBedrockChatModel(BaseChatModel):
+    """
+    Chat model that mimics Bedrock latency, throttling and usage metadata.
+
+    Responses echo the last user message, so no AWS access is needed.
+    """
+
+    latency: float = 0.05
+    throttle_rate: float = 0.0
+    output_tokens: int = 64
+    seed: Optional[int] = None
+
+    _rng: Optional[random.Random] = PrivateAttr(default=None)
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-bedrock"
+
+    def _random(self) -> float:
+        with self._lock:
+            if self._rng is None:
+                self._rng = random.Random(self.seed)
+            return self._rng.random()
+
+    def _maybe_throttle(self) -> None:
+        if self.throttle_rate and self._random() < self.throttle_rate:
+            raise ClientError(
+                {
+                    "Error": {
+                        "Code": "ThrottlingException",
+                        "Message": "Too many requests, please wait before trying again.",
+                    }
+                },
+                "InvokeModel",
+            )
+
+    def _reply(self, messages: List[BaseMessage]) -> str:
+        prompt = str(messages[-1].content) if messages else ""
+        words = (prompt.split() or ["ok"]) * self.output_tokens
+        return " ".join(words[: self.output_tokens])
+
+    def _usage(self, messages: List[BaseMessage], reply: str) -> dict:
+        input_tokens = sum(estimate_tokens(str(m.content)) for m in messages)
+        output_tokens = estimate_tokens(reply)
+        return {
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+        }
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        self._maybe_throttle()
+        time.sleep(self.latency)
+
+        reply = self._reply(messages)
+        message = AIMessage(
+            content=reply, usage_metadata=self._usage(messages, reply)
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        self._maybe_throttle()
+        time.sleep(self.latency)
+
+        reply = self._reply(messages)
+        for word in reply.split(" "):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word + " "))
+
+        yield ChatGenerationChunk(
+            message=AIMessageChunk(
+                content="", usage_metadata=self._usage(messages, reply)
+            )
+        )
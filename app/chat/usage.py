@@ -0,0 +1,271 @@
+"""Token usage accounting with periodic flushes to PostgreSQL."""
+
+import atexit
+import logging
+import threading
+from datetime import date, datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+
+from app.auth.database import get_db_session
+from app.auth.models import Usage
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# (username, model_id, day) -> [input_tokens, output_tokens, request_count]
+UsageKey = Tuple[str, str, date]
+
+
+def estimate_tokens(text: str) -> int:
+    """Roughly estimate token count (~4 characters per token)."""
+    return max(1, len(text) // 4) if text else 0
+
+
+class UsageTracker:
+    """
+    In-memory token counters flushed to the usage table on an interval.
+
+    Recording a chat turn and checking a quota only touch memory; the
+    database sees one upsert per (user, model, day) per flush. Usage is only
+    recorded while the flush thread runs, so counters never pile up
+    unflushed when the database is unavailable.
+    """
+
+    def __init__(
+        self,
+        flush_interval: Optional[int] = None,
+        daily_quota: Optional[int] = None,
+    ):
+        """
+        Initialize usage tracker.
+
+        Args:
+            flush_interval: Seconds between flushes to the database.
+            daily_quota: Maximum tokens per user per day (None for no limit).
+        """
+        settings = get_settings()
+
+        self.flush_interval = flush_interval or settings.usage_flush_interval
+        self.daily_quota = (
+            daily_quota if daily_quota is not None else settings.usage_daily_token_quota
+        )
+
+        self._pending: Dict[UsageKey, List[int]] = {}
+        # Daily totals per (username, day), split into tokens already in the
+        # usage table and tokens this instance has not flushed yet
+        self._flushed: Dict[Tuple[str, date], int] = {}
+        self._unflushed: Dict[Tuple[str, date], int] = {}
+        self._seeded: Set[Tuple[str, date]] = set()
+        self._lock = threading.Lock()
+        # Serializes flushes with seeding so a seed read never races a flush
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def record(
+        self, username: str, model_id: str, input_tokens: int, output_tokens: int
+    ) -> None:
+        """
+        Record token usage of one request (ignored until start() is called).
+
+        Args:
+            username: User who made the request.
+            model_id: Bedrock model ID.
+            input_tokens: Prompt tokens.
+            output_tokens: Completion tokens.
+        """
+        if not self.is_running():
+            return
+
+        today = datetime.utcnow().date()
+
+        with self._lock:
+            counters = self._pending.setdefault((username, model_id, today), [0, 0, 0])
+            counters[0] += input_tokens
+            counters[1] += output_tokens
+            counters[2] += 1
+
+            daily_key = (username, today)
+            self._unflushed[daily_key] = (
+                self._unflushed.get(daily_key, 0) + input_tokens + output_tokens
+            )
+
+    def daily_total(self, username: str) -> int:
+        """Get tokens used today by a user, as known to this instance."""
+        daily_key = (username, datetime.utcnow().date())
+        with self._lock:
+            return self._flushed.get(daily_key, 0) + self._unflushed.get(daily_key, 0)
+
+    def check_quota(self, username: str) -> bool:
+        """
+        Check whether a user is still within the daily token quota.
+
+        The first check for a user each day loads their persisted total,
+        so restarts do not reset the quota; later checks are memory-only.
+
+        Args:
+            username: User to check.
+
+        Returns:
+            True if the request may proceed, False if the quota is exceeded.
+        """
+        if self.daily_quota is None:
+            return True
+
+        today = datetime.utcnow().date()
+        if (username, today) not in self._seeded:
+            self._seed(username, today)
+
+        return self.daily_total(username) < self.daily_quota
+
+    def _seed(self, username: str, day: date) -> None:
+        """
+        Load a user's persisted usage for the day into memory.
+
+        The persisted total replaces the flushed part of the in-memory total
+        (it already includes this instance's flushes); unflushed tokens are
+        kept on top.
+        """
+        with self._flush_lock:
+            if (username, day) in self._seeded:
+                return
+
+            try:
+                with get_db_session() as session:
+                    persisted: Optional[int] = session.execute(
+                        select(
+                            func.coalesce(
+                                func.sum(Usage.input_tokens + Usage.output_tokens), 0
+                            )
+                        ).where(Usage.username == username, Usage.day == day)
+                    ).scalar_one()
+            except Exception as e:
+                # Don't retry on every request; count from in-memory totals only
+                logger.error(f"Error loading usage for '{username}': {e}")
+                persisted = None
+
+            with self._lock:
+                self._seeded.add((username, day))
+                if persisted is not None:
+                    self._flushed[(username, day)] = int(persisted)
+
+    def flush(self) -> int:
+        """
+        Upsert pending counters into the usage table.
+
+        Returns:
+            Number of (user, model, day) rows written.
+        """
+        with self._flush_lock:
+            return self._flush()
+
+    def _flush(self) -> int:
+        """Flush pending counters (caller holds the flush lock)."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._prune_daily()
+
+        if not pending:
+            return 0
+
+        rows = [
+            {
+                "username": username,
+                "model_id": model_id,
+                "day": day,
+                "input_tokens": counters[0],
+                "output_tokens": counters[1],
+                "request_count": counters[2],
+            }
+            for (username, model_id, day), counters in pending.items()
+        ]
+
+        stmt = insert(Usage)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Usage.username, Usage.model_id, Usage.day],
+            set_={
+                "input_tokens": Usage.input_tokens + stmt.excluded.input_tokens,
+                "output_tokens": Usage.output_tokens + stmt.excluded.output_tokens,
+                "request_count": Usage.request_count + stmt.excluded.request_count,
+                "updated_at": datetime.utcnow(),
+            },
+        )
+
+        try:
+            with get_db_session() as session:
+                session.execute(stmt, rows)
+        except Exception as e:
+            logger.error(f"Error flushing usage: {e}")
+            self._restore(pending)
+            return 0
+
+        with self._lock:
+            for (username, _, day), counters in pending.items():
+                daily_key = (username, day)
+                tokens = counters[0] + counters[1]
+                self._unflushed[daily_key] = self._unflushed.get(daily_key, 0) - tokens
+                self._flushed[daily_key] = self._flushed.get(daily_key, 0) + tokens
+            self._prune_daily()
+
+        logger.debug(f"Flushed usage for {len(rows)} rows")
+        return len(rows)
+
+    def _restore(self, pending: Dict[UsageKey, List[int]]) -> None:
+        """Merge counters from a failed flush back into pending."""
+        with self._lock:
+            for key, counters in pending.items():
+                current = self._pending.setdefault(key, [0, 0, 0])
+                for i, value in enumerate(counters):
+                    current[i] += value
+
+    def _prune_daily(self) -> None:
+        """Drop in-memory totals from previous days (caller holds the lock)."""
+        today = datetime.utcnow().date()
+        self._flushed = {k: v for k, v in self._flushed.items() if k[1] == today}
+        self._unflushed = {k: v for k, v in self._unflushed.items() if k[1] == today}
+        self._seeded = {k for k in self._seeded if k[1] == today}
+
+    def is_running(self) -> bool:
+        """Whether the background flush thread has been started."""
+        return self._thread is not None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def start(self) -> None:
+        """Start the background flush thread."""
+        if self._thread is not None:
+            return
+
+        self._thread = threading.Thread(
+            target=self._run, name="usage-flush", daemon=True
+        )
+        self._thread.start()
+        atexit.register(self.stop)
+        logger.info(f"Usage tracking started (flush every {self.flush_interval}s)")
+
+    def stop(self) -> None:
+        """Stop the background thread and flush remaining counters."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self.flush()
+
+
+# Global tracker instance
+_usage_tracker: Optional[UsageTracker] = None
+
+
+def get_usage_tracker() -> UsageTracker:
+    """Get or create global usage tracker instance."""
+    global _usage_tracker
+
+    if _usage_tracker is None:
+        _usage_tracker = UsageTracker()
+
+    return _usage_tracker
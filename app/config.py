@@ -3,6 +3,7 @@
 from functools import lru_cache
 from typing import Optional
 
+from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -37,9 +38,26 @@ class Settings(BaseSettings):
     bedrock_model_id: str = "mistral.mistral-large-2402-v1:0"
     bedrock_max_tokens: int = 1024
     bedrock_temperature: float = 0.7
+    bedrock_client_cache_size: int = 32
+    bedrock_max_pool_connections: int = 50
 
     # Auth settings
     auth_enabled: bool = True
+    # Pin bcrypt_rounds when running several instances so they agree on the cost
+    bcrypt_rounds: Optional[int] = Field(default=None, ge=4, le=31)
+    bcrypt_target_ms: float = 250.0
+    bcrypt_min_rounds: int = Field(default=10, ge=4, le=31)
+    bcrypt_max_rounds: int = Field(default=15, ge=4, le=31)
+
+    # Usage accounting settings
+    usage_tracking_enabled: bool = True
+    usage_flush_interval: int = 60
+    usage_daily_token_quota: Optional[int] = None
+
+    # Profiling settings
+    timing_enabled: bool = False
+    profiler_interval_ms: float = 10.0
+    profiler_max_seconds: int = 60
 
     @property
     def database_url(self) -> str:
@@ -2,14 +2,24 @@
 
 import logging
 import sys
-from typing import Any, Dict, Generator, List
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, Generator, List, Optional
 
 import gradio as gr
 
-from app.auth.auth_handler import gradio_auth
+from app.auth.auth_handler import calibrate_bcrypt_rounds, gradio_auth, is_admin_user
 from app.auth.database import check_database_connection, init_database
 from app.chat.bedrock_client import get_chat_client
+from app.chat.usage import get_usage_tracker
 from app.config import get_settings
+from app.utils.profiling import (
+    SamplingProfiler,
+    get_timings,
+    is_timing_enabled,
+    set_timing_enabled,
+)
 
 # Configure logging
 logging.basicConfig(
@@ -22,9 +32,12 @@ logger = logging.getLogger(__name__)
 # Type alias for chat history (Gradio 5+ format)
 ChatHistory = List[Dict[str, Any]]
 
+# Profiler output; each capture replaces the previous one
+PROFILE_DIR = Path(tempfile.gettempdir()) / "chatbot-profiles"
+
 
 def chat_response(
-    message: str, history: ChatHistory
+    message: str, history: ChatHistory, request: gr.Request = None
 ) -> Generator[str, None, None]:
     """
     Generate chat response with streaming.
@@ -32,12 +45,75 @@ def chat_response(
     Args:
         message: User's message.
         history: Chat history.
+        request: Gradio request (provides the logged-in username).
 
     Yields:
         Streamed response chunks.
     """
+    username = request.username if request else None
+
+    if username and not get_usage_tracker().check_quota(username):
+        yield "Daily token quota exceeded. Please try again tomorrow."
+        return
+
     client = get_chat_client()
-    yield from client.chat_stream(message, history)
+    yield from client.chat_stream(message, history, username=username)
+
+
+def _require_admin(request: Optional[gr.Request]) -> None:
+    """Reject requests from users who are not admins."""
+    username = request.username if request else None
+    if not is_admin_user(username):
+        logger.warning(f"Diagnostics access denied for '{username}'")
+        raise gr.Error("Admin access required")
+
+
+def capture_profile(duration: float, request: gr.Request = None) -> str:
+    """
+    Run the sampling profiler and return a collapsed-stack file.
+
+    Args:
+        duration: Seconds to sample for.
+        request: Gradio request (must come from an admin).
+
+    Returns:
+        Path to the collapsed-stack file (replaces the previous capture).
+    """
+    _require_admin(request)
+    logger.info(f"Profiling for {duration:.0f}s requested by '{request.username}'")
+
+    try:
+        stacks = SamplingProfiler().run(duration)
+    except RuntimeError as e:
+        raise gr.Error(str(e))
+
+    PROFILE_DIR.mkdir(exist_ok=True)
+    for old in PROFILE_DIR.glob("profile-*.collapsed"):
+        old.unlink(missing_ok=True)
+
+    path = PROFILE_DIR / f"profile-{time.strftime('%Y%m%d-%H%M%S')}.collapsed"
+    path.write_text(stacks)
+
+    return str(path)
+
+
+def toggle_timing(enabled: bool, request: gr.Request = None) -> Dict[str, Any]:
+    """Turn timing hooks on or off and return current timings."""
+    _require_admin(request)
+    set_timing_enabled(enabled)
+    return get_timings()
+
+
+def show_timings(request: gr.Request = None) -> Dict[str, Any]:
+    """Return collected timings."""
+    _require_admin(request)
+    return get_timings()
+
+
+def diagnostics_visibility(request: gr.Request = None) -> gr.Accordion:
+    """Show the diagnostics panel to admins only."""
+    username = request.username if request else None
+    return gr.Accordion(visible=is_admin_user(username))
 
 
 def create_app() -> gr.Blocks:
@@ -54,6 +130,34 @@ def create_app() -> gr.Blocks:
 
         gr.ChatInterface(fn=chat_response)
 
+        with gr.Accordion("Diagnostics", open=False, visible=False) as diagnostics:
+            with gr.Row():
+                profile_seconds = gr.Slider(
+                    minimum=1,
+                    maximum=settings.profiler_max_seconds,
+                    value=10,
+                    step=1,
+                    label="Profile duration (s)",
+                )
+                profile_button = gr.Button("Capture profile")
+            profile_file = gr.File(label="Collapsed stacks (flamegraph.pl, speedscope)")
+
+            with gr.Row():
+                timing_checkbox = gr.Checkbox(
+                    value=is_timing_enabled(), label="Enable timing hooks"
+                )
+                timings_button = gr.Button("Refresh timings")
+            timings_json = gr.JSON(label="Timings")
+
+        profile_button.click(
+            capture_profile, inputs=profile_seconds, outputs=profile_file
+        )
+        timing_checkbox.change(
+            toggle_timing, inputs=timing_checkbox, outputs=timings_json
+        )
+        timings_button.click(show_timings, outputs=timings_json)
+        app.load(diagnostics_visibility, outputs=diagnostics)
+
         gr.Markdown(
             """
             ---
@@ -74,10 +178,14 @@ def main() -> None:
 
     # Initialize database if auth is enabled
     if settings.auth_enabled:
+        calibrate_bcrypt_rounds()
+
         logger.info("Checking database connection...")
         if check_database_connection():
             logger.info("Database connection successful")
             init_database()
+            if settings.usage_tracking_enabled:
+                get_usage_tracker().start()
         else:
             logger.error("Database connection failed!")
             if not settings.debug:
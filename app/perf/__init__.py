@@ -0,0 +1 @@
+"""Performance tooling: traffic capture and replay."""
@@ -0,0 +1,130 @@
+"""
+Capture anonymized request traces from application logs.
+
+Usage:
+    python -m app.perf.capture /var/log/app/*.log -o trace.jsonl.gz
+
+Reads login and "Chat turn completed" lines, replaces usernames with
+session numbers and stores only sizes and timings. Think times are kept
+as the offsets between a session's events.
+"""
+
+import argparse
+import logging
+import re
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.perf.trace import TraceEvent, write_trace
+
+logger = logging.getLogger(__name__)
+
+LOG_LINE = re.compile(
+    r"(?P<ts>\d{4}-\d\d-\d\d \d\d:\d\d:\d\d,\d{3}) - (?P<name>\S+) - "
+    r"(?P<level>\w+) - (?P<message>.*)$"
+)
+LOGIN_OK = re.compile(r"^User '(?P<user>.*)' authenticated successfully$")
+LOGIN_FAILED = re.compile(r"^Authentication failed: .*'(?P<user>.*)'")
+CHAT_TURN = re.compile(r"^Chat turn completed for '(?P<user>.*)': (?P<fields>.*)$")
+FIELD = re.compile(r"(\w+)=(\d+(?:\.\d+)?)")
+
+INT_FIELDS = {"message_chars", "history_messages", "history_chars", "output_chars"}
+FLOAT_FIELDS = {"ttft_ms", "total_ms"}
+
+
+def parse_lines(lines: Iterable[str]) -> List[TraceEvent]:
+    """
+    Parse log lines into trace events.
+
+    Args:
+        lines: Application log lines.
+
+    Returns:
+        Events ordered by offset from the first event.
+    """
+    sessions: Dict[str, int] = {}
+    raw: List[Tuple[float, TraceEvent]] = []
+
+    for line in lines:
+        match = LOG_LINE.search(line.rstrip("\n"))
+        if not match:
+            continue
+
+        timestamp = datetime.strptime(
+            match["ts"], "%Y-%m-%d %H:%M:%S,%f"
+        ).timestamp()
+        message = match["message"]
+
+        login_ok = LOGIN_OK.match(message)
+        login_failed = None if login_ok else LOGIN_FAILED.match(message)
+        chat_turn = CHAT_TURN.match(message)
+
+        if login_ok or login_failed:
+            user = (login_ok or login_failed)["user"]
+            event = TraceEvent(offset=0.0, session=0, kind="login", ok=bool(login_ok))
+        elif chat_turn:
+            user = chat_turn["user"]
+            fields = dict(FIELD.findall(chat_turn["fields"]))
+            event = TraceEvent(offset=0.0, session=0, kind="chat")
+            for key, value in fields.items():
+                if key in INT_FIELDS:
+                    setattr(event, key, int(float(value)))
+                elif key in FLOAT_FIELDS:
+                    setattr(event, key, float(value))
+            # The line is logged when the turn ends; replay needs its start
+            timestamp -= (event.total_ms or 0) / 1000
+        else:
+            continue
+
+        event.session = sessions.setdefault(user, len(sessions))
+        raw.append((timestamp, event))
+
+    if not raw:
+        return []
+
+    raw.sort(key=lambda item: item[0])
+    first = raw[0][0]
+    for timestamp, event in raw:
+        event.offset = round(timestamp - first, 3)
+
+    return [event for _, event in raw]
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Capture an anonymized request trace from app logs."
+    )
+    parser.add_argument("logs", type=Path, nargs="+", help="Application log files")
+    parser.add_argument(
+        "-o", "--output", type=Path, required=True, help="Trace file (.jsonl.gz)"
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run the capture CLI."""
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+        handlers=[logging.StreamHandler(sys.stderr)],
+    )
+    args = parse_args(argv)
+
+    lines: List[str] = []
+    for path in args.logs:
+        with path.open(encoding="utf-8", errors="replace") as f:
+            lines.extend(f)
+
+    events = parse_lines(lines)
+    count = write_trace(args.output, events)
+    sessions = len({event.session for event in events})
+    logger.info(f"Captured {count} events from {sessions} sessions to {args.output}")
+
+    return 0 if count else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,426 @@
+"""
+Replay a captured trace against the running app with a fake Bedrock.
+
+Usage:
+    python -m app.perf.replay trace.jsonl.gz --baseline perf-baseline.json
+
+The app is launched in-process on --port with a fake model that reproduces
+each turn's recorded TTFT and output length, and the database from the DB_*
+settings (e.g. the docker-compose Postgres). Each session's events run in
+order over HTTP, separated by the recorded think times (divided by
+--speed): logins POST to Gradio's /login, so they go through gradio_auth and
+the users table, and chat turns are submitted with gradio_client to the
+/chat_response endpoint, so they wait in the Gradio queue like browser
+traffic. Sessions log in as replay-<n> users, which are created on first use.
+
+Chat history comes from the replayed turns of the same session, so a trace
+that starts mid-conversation replays with shorter histories than recorded.
+Peak RSS covers the app and the replay clients, which share the process.
+
+With --baseline, exits non-zero if chat/login p95 latency or peak RSS
+regressed by more than --max-regression compared to the baseline file.
+"""
+
+import argparse
+import json
+import logging
+import math
+import re
+import resource
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import httpx
+from gradio_client import Client
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.messages import AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGenerationChunk
+
+from app.auth.bulk import BulkUser, bulk_create_users
+from app.chat.bedrock_client import ChatClientRegistry, set_client_registry
+from app.chat.fake import FakeBedrockChatModel
+from app.perf.trace import TraceEvent, read_trace
+
+logger = logging.getLogger(__name__)
+
+CHARS_PER_CHUNK = 4
+REPLAY_PASSWORD = "replay-password"
+CHAT_API = "/chat_response"
+TURN_MARKER = re.compile(r"^\[turn (\d+)\]")
+
+# Recorded chat turns by trace index; messages carry the index as a marker
+_turns: Dict[int, TraceEvent] = {}
+
+
+class ReplayChatModel(FakeBedrockChatModel):
+    """Fake model that streams the recorded output length at the recorded pace."""
+
+    speed: float = 1.0
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        match = TURN_MARKER.match(str(messages[-1].content)) if messages else None
+        event = _turns.get(int(match[1])) if match else None
+        if event is None:
+            yield from super()._stream(messages, stop, run_manager, **kwargs)
+            return
+
+        output_chars = max(event.output_chars or 0, 1)
+        chunks = max(1, output_chars // CHARS_PER_CHUNK)
+        ttft = (event.ttft_ms or 0) / 1000 / self.speed
+        generation = max(0.0, (event.total_ms or 0) - (event.ttft_ms or 0))
+        chunk_delay = generation / 1000 / self.speed / chunks
+
+        time.sleep(ttft)
+        for i in range(chunks):
+            if i:
+                time.sleep(chunk_delay)
+            yield ChatGenerationChunk(
+                message=AIMessageChunk(content="x" * CHARS_PER_CHUNK)
+            )
+
+
+@dataclass
+class ReplayReport:
+    """Latency and memory measured during a replay."""
+
+    chat_p50_ms: float = 0.0
+    chat_p95_ms: float = 0.0
+    chat_max_ms: float = 0.0
+    ttft_p95_ms: float = 0.0
+    login_p95_ms: float = 0.0
+    peak_rss_mb: float = 0.0
+    events: int = 0
+    errors: int = 0
+    late_ms_p95: float = 0.0
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of values (0 if empty)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[rank]
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS and kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def session_username(session: int) -> str:
+    """Username a replayed session logs in as."""
+    return f"replay-{session}"
+
+
+def turn_message(index: int, event: TraceEvent) -> str:
+    """Build a chat message with the recorded size that identifies its turn."""
+    marker = f"[turn {index}] "
+    return marker + "m" * max(1, (event.message_chars or 1) - len(marker))
+
+
+def provision_users(sessions: Iterable[int]) -> None:
+    """Create the users replayed sessions log in as, if they do not exist."""
+    users = [
+        BulkUser(row=row, username=session_username(session), password=REPLAY_PASSWORD)
+        for row, session in enumerate(sessions, start=1)
+    ]
+    result = bulk_create_users(users)
+
+    for failure in result.failures:
+        if "already exists" not in failure.error:
+            logger.warning(f"Could not create {failure.username}: {failure.error}")
+    logger.info(f"Created {result.created} replay users")
+
+
+class Replayer:
+    """Replays trace sessions concurrently against a running app."""
+
+    def __init__(self, events: List[TraceEvent], url: str, speed: float = 1.0):
+        """
+        Initialize replayer.
+
+        Args:
+            events: Trace events ordered by offset.
+            url: Base URL of the launched app.
+            speed: Time compression factor for think times and model latency.
+        """
+        self.url = url.rstrip("/")
+        self.speed = speed
+        self.sessions: Dict[int, List[Tuple[int, TraceEvent]]] = defaultdict(list)
+        for index, event in enumerate(events):
+            self.sessions[event.session].append((index, event))
+            if event.kind == "chat":
+                _turns[index] = event
+
+        self._durations: Dict[str, List[float]] = defaultdict(list)
+        self._errors = 0
+        self._lock = threading.Lock()
+        self._start = 0.0
+
+    def _record(self, metric: str, value: float) -> None:
+        with self._lock:
+            self._durations[metric].append(value)
+
+    def _error(self) -> None:
+        with self._lock:
+            self._errors += 1
+
+    def _login(self, username: str, password: str) -> Optional[Dict[str, str]]:
+        """Log in through Gradio, returning the session cookies on success."""
+        response = httpx.post(
+            f"{self.url}/login", data={"username": username, "password": password}
+        )
+        return dict(response.cookies) if response.status_code == 200 else None
+
+    def _connect(self, cookies: Optional[Dict[str, str]]) -> Client:
+        if cookies is None:
+            raise RuntimeError("Login failed")
+        return Client(
+            self.url,
+            verbose=False,
+            download_files=False,
+            httpx_kwargs={"cookies": cookies},
+        )
+
+    def _run_login(self, event: TraceEvent, username: str) -> Optional[Dict[str, str]]:
+        password = REPLAY_PASSWORD if event.ok else "wrong-password"
+        start = time.perf_counter()
+        cookies = self._login(username, password)
+        self._record("login", (time.perf_counter() - start) * 1000)
+
+        if event.ok and cookies is None:
+            self._error()
+        return cookies
+
+    def _run_chat(self, index: int, event: TraceEvent, client: Client) -> None:
+        start = time.perf_counter()
+        first = None
+        job = client.submit(turn_message(index, event), api_name=CHAT_API)
+        for _ in job:
+            if first is None:
+                first = time.perf_counter()
+        last = job.result()
+
+        elapsed = (time.perf_counter() - start) * 1000
+        if str(last).startswith("Sorry, I encountered an error"):
+            self._error()
+        self._record("chat", elapsed)
+        if first is not None:
+            self._record("ttft", (first - start) * 1000)
+
+    def _run_session(self, session: int) -> None:
+        username = session_username(session)
+        client: Optional[Client] = None
+
+        try:
+            for index, event in self.sessions[session]:
+                due = self._start + event.offset / self.speed
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    self._record("late", -delay * 1000)
+
+                try:
+                    if event.kind == "login":
+                        cookies = self._run_login(event, username)
+                        if cookies is not None:
+                            # Load the app during think time, like a browser
+                            if client is not None:
+                                client.close()
+                            client = self._connect(cookies)
+                    elif event.kind == "chat":
+                        if client is None:
+                            # Trace started after this session logged in
+                            client = self._connect(
+                                self._login(username, REPLAY_PASSWORD)
+                            )
+                        self._run_chat(index, event, client)
+                except Exception as e:
+                    logger.error(f"Replay error in session {session}: {e}")
+                    self._error()
+        finally:
+            if client is not None:
+                client.close()
+
+    def run(self, concurrency: int) -> ReplayReport:
+        """
+        Replay all sessions.
+
+        Args:
+            concurrency: Maximum sessions running at once; sessions beyond
+                this start late, which shows up in late_ms_p95.
+
+        Returns:
+            Replay report.
+        """
+        self._start = time.perf_counter()
+        with ThreadPoolExecutor(
+            max_workers=concurrency, thread_name_prefix="replay"
+        ) as executor:
+            order = sorted(self.sessions, key=lambda s: self.sessions[s][0][1].offset)
+            list(executor.map(self._run_session, order))
+
+        durations = dict(self._durations)
+        return ReplayReport(
+            chat_p50_ms=percentile(durations.get("chat", []), 50),
+            chat_p95_ms=percentile(durations.get("chat", []), 95),
+            chat_max_ms=max(durations.get("chat", [0.0])),
+            ttft_p95_ms=percentile(durations.get("ttft", []), 95),
+            login_p95_ms=percentile(durations.get("login", []), 95),
+            peak_rss_mb=peak_rss_mb(),
+            events=sum(len(events) for events in self.sessions.values()),
+            errors=self._errors,
+            late_ms_p95=percentile(durations.get("late", []), 95),
+        )
+
+
+GATED_METRICS = ("chat_p95_ms", "login_p95_ms", "peak_rss_mb")
+
+
+def compare(
+    report: ReplayReport, baseline: Dict[str, float], max_regression: float
+) -> List[str]:
+    """
+    Compare a report with a baseline.
+
+    Args:
+        report: Current replay report.
+        baseline: Metrics from a previous run.
+        max_regression: Allowed relative increase (0.2 = 20%).
+
+    Returns:
+        Descriptions of metrics that regressed beyond the threshold.
+    """
+    regressions = []
+    for metric in GATED_METRICS:
+        previous = baseline.get(metric)
+        current = getattr(report, metric)
+        if previous and current > previous * (1 + max_regression):
+            regressions.append(
+                f"{metric}: {current:.1f} vs baseline {previous:.1f} "
+                f"(+{(current / previous - 1) * 100:.0f}%)"
+            )
+    return regressions
+
+
+def _report_dict(report: ReplayReport) -> Dict[str, Any]:
+    return {
+        k: round(v, 3) if isinstance(v, float) else v
+        for k, v in asdict(report).items()
+    }
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Replay a captured trace and check for performance regressions."
+    )
+    parser.add_argument("trace", type=Path, help="Trace file (.jsonl.gz)")
+    parser.add_argument("--speed", type=float, default=1.0)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--port", type=int, default=7870, help="Port to launch the app on")
+    parser.add_argument("--baseline", type=Path, default=None)
+    parser.add_argument("--max-regression", type=float, default=0.2)
+    parser.add_argument(
+        "--write-baseline",
+        action="store_true",
+        help="Write this run's metrics to --baseline instead of comparing",
+    )
+    parser.add_argument("--report", type=Path, default=None, help="JSON report path")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run the replay CLI."""
+    logging.basicConfig(
+        level=logging.WARNING,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+        handlers=[logging.StreamHandler(sys.stderr)],
+    )
+    logger.setLevel(logging.INFO)
+    args = parse_args(argv)
+
+    # Imported after logging is configured so per-turn INFO logs stay quiet
+    from app.auth.auth_handler import calibrate_bcrypt_rounds, gradio_auth
+    from app.auth.database import check_database_connection, init_database
+    from app.chat.usage import get_usage_tracker
+    from app.config import get_settings
+    from app.main import create_app
+
+    events = read_trace(args.trace)
+    set_client_registry(ChatClientRegistry(llm=ReplayChatModel(speed=args.speed)))
+
+    calibrate_bcrypt_rounds()
+    if not check_database_connection():
+        logger.error("Database connection failed")
+        return 1
+    init_database()
+
+    sessions = sorted({event.session for event in events})
+    provision_users(sessions)
+
+    tracker = get_usage_tracker()
+    if get_settings().usage_tracking_enabled:
+        tracker.start()
+
+    app = create_app()
+    _, url, _ = app.launch(
+        server_name="127.0.0.1",
+        server_port=args.port,
+        auth=gradio_auth,
+        prevent_thread_lock=True,
+        quiet=True,
+    )
+
+    try:
+        replayer = Replayer(events, url, speed=args.speed)
+        logger.info(
+            f"Replaying {len(events)} events from {len(sessions)} sessions "
+            f"at {args.speed}x against {url}"
+        )
+        report = replayer.run(args.concurrency)
+    finally:
+        app.close()
+        tracker.stop()
+
+    metrics = _report_dict(report)
+    logger.info(f"Replay finished: {json.dumps(metrics)}")
+
+    if args.report:
+        args.report.write_text(json.dumps(metrics, indent=2) + "\n")
+
+    if args.baseline and args.write_baseline:
+        args.baseline.write_text(json.dumps(metrics, indent=2) + "\n")
+        logger.info(f"Baseline written to {args.baseline}")
+        return 0
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())
+        regressions = compare(report, baseline, args.max_regression)
+        for regression in regressions:
+            logger.error(f"Regression: {regression}")
+        if regressions:
+            return 1
+        logger.info("No regressions beyond threshold")
+
+    return 1 if report.errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
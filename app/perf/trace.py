@@ -0,0 +1,73 @@
+"""Anonymized request trace format shared by capture and replay."""
+
+import gzip
+import json
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+TRACE_VERSION = 1
+
+
+@dataclass
+class TraceEvent:
+    """
+    Single recorded request.
+
+    Sessions are numbered in order of first appearance; no usernames or
+    message contents are stored.
+    """
+
+    offset: float
+    session: int
+    kind: str
+    ok: Optional[bool] = None
+    message_chars: Optional[int] = None
+    history_messages: Optional[int] = None
+    history_chars: Optional[int] = None
+    output_chars: Optional[int] = None
+    ttft_ms: Optional[float] = None
+    total_ms: Optional[float] = None
+
+
+def write_trace(path: Path, events: Iterable[TraceEvent]) -> int:
+    """
+    Write events to a gzipped JSONL trace file.
+
+    Args:
+        path: Trace file path.
+        events: Events ordered by offset.
+
+    Returns:
+        Number of events written.
+    """
+    count = 0
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        f.write(json.dumps({"version": TRACE_VERSION}) + "\n")
+        for event in events:
+            record = {k: v for k, v in asdict(event).items() if v is not None}
+            f.write(json.dumps(record, separators=(",", ":")) + "\n")
+            count += 1
+    return count
+
+
+def read_trace(path: Path) -> List[TraceEvent]:
+    """
+    Read events from a trace file.
+
+    Args:
+        path: Trace file path.
+
+    Returns:
+        Events ordered by offset.
+
+    Raises:
+        ValueError: If the trace version is not supported.
+    """
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        header = json.loads(f.readline())
+        if header.get("version") != TRACE_VERSION:
+            raise ValueError(f"Unsupported trace version: {header.get('version')}")
+        events = [TraceEvent(**json.loads(line)) for line in f if line.strip()]
+
+    return sorted(events, key=lambda event: event.offset)
@@ -0,0 +1,249 @@
+"""Hot-path timing hooks and an on-demand sampling profiler."""
+
+import functools
+import inspect
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Generator, Optional, TypeVar
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+# Blocking-wait plumbing and the pool loops that park idle threads in it
+WAIT_FILES = {"threading.py", "queue.py", "selectors.py"}
+IDLE_LOOPS = {
+    ("thread.py", "_worker"),  # concurrent.futures
+    ("_asyncio.py", "run"),  # anyio worker threads used by Gradio
+    ("base_events.py", "_run_once"),  # asyncio event loop
+}
+
+
+@dataclass
+class TimingStats:
+    """Accumulated timings of one instrumented function."""
+
+    count: int = 0
+    total: float = 0.0
+    max: float = 0.0
+
+    def add(self, elapsed: float) -> None:
+        self.count += 1
+        self.total += elapsed
+        if elapsed > self.max:
+            self.max = elapsed
+
+
+_timing_enabled: bool = get_settings().timing_enabled
+_timings: Dict[str, TimingStats] = {}
+_timings_lock = threading.Lock()
+
+
+def set_timing_enabled(enabled: bool) -> None:
+    """Turn timing collection on or off at runtime."""
+    global _timing_enabled
+    _timing_enabled = enabled
+    logger.info(f"Timing hooks {'enabled' if enabled else 'disabled'}")
+
+
+def is_timing_enabled() -> bool:
+    """Check whether timing collection is on."""
+    return _timing_enabled
+
+
+def _record(name: str, elapsed: float) -> None:
+    with _timings_lock:
+        stats = _timings.get(name)
+        if stats is None:
+            stats = _timings[name] = TimingStats()
+        stats.add(elapsed)
+
+
+def get_timings() -> Dict[str, Dict[str, float]]:
+    """
+    Get a snapshot of collected timings.
+
+    Returns:
+        Mapping of function name to count, total_ms, avg_ms and max_ms.
+    """
+    with _timings_lock:
+        return {
+            name: {
+                "count": stats.count,
+                "total_ms": round(stats.total * 1000, 3),
+                "avg_ms": round(stats.total * 1000 / stats.count, 3),
+                "max_ms": round(stats.max * 1000, 3),
+            }
+            for name, stats in sorted(_timings.items())
+        }
+
+
+def reset_timings() -> None:
+    """Clear collected timings."""
+    with _timings_lock:
+        _timings.clear()
+
+
+def _timed_generator(
+    name: str, generator: Generator[Any, Any, Any]
+) -> Generator[Any, Any, Any]:
+    """Time the work done inside a generator, excluding the consumer's time."""
+    elapsed = 0.0
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(generator)
+            except StopIteration as stop:
+                elapsed += time.perf_counter() - start
+                return stop.value
+            elapsed += time.perf_counter() - start
+            yield item
+    finally:
+        generator.close()
+        _record(name, elapsed)
+
+
+def timed(name: Optional[str] = None) -> Callable[[F], F]:
+    """
+    Decorator that records call timings when timing is enabled.
+
+    When disabled the only overhead is one global flag check per call.
+    Generator functions are timed across their whole iteration.
+
+    Args:
+        name: Name to record under (defaults to module.qualname).
+    """
+
+    def decorator(func: F) -> F:
+        label = name or f"{func.__module__}.{func.__qualname__}"
+
+        if inspect.isgeneratorfunction(func):
+
+            @functools.wraps(func)
+            def generator_wrapper(*args: Any, **kwargs: Any) -> Any:
+                if not _timing_enabled:
+                    return func(*args, **kwargs)
+                return _timed_generator(label, func(*args, **kwargs))
+
+            return generator_wrapper  # type: ignore[return-value]
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if not _timing_enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _record(label, time.perf_counter() - start)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+class SamplingProfiler:
+    """
+    Wall-clock sampling profiler over all Python threads.
+
+    run() samples on the calling thread, blocking it for the whole window,
+    and snapshots every other thread's stack at a fixed interval. Threads
+    parked idle in a pool are skipped so waits do not dominate the output,
+    which is in the collapsed-stack format read by flamegraph.pl and
+    speedscope.
+    """
+
+    _run_lock = threading.Lock()
+
+    def __init__(self, interval: Optional[float] = None):
+        """
+        Initialize sampling profiler.
+
+        Args:
+            interval: Seconds between samples.
+        """
+        settings = get_settings()
+
+        self.interval = interval or settings.profiler_interval_ms / 1000
+        self._samples: Counter = Counter()
+        self._labels: Dict[Any, str] = {}
+
+    def _frame_label(self, code: Any) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            filename = os.path.basename(code.co_filename)
+            label = f"{code.co_name} ({filename}:{code.co_firstlineno})".replace(
+                ";", ":"
+            )
+            self._labels[code] = label
+        return label
+
+    @staticmethod
+    def _is_idle(frame: Any) -> bool:
+        """Whether a thread is only waiting for work in a pool loop."""
+        while frame is not None:
+            filename = os.path.basename(frame.f_code.co_filename)
+            if filename not in WAIT_FILES:
+                return (filename, frame.f_code.co_name) in IDLE_LOOPS
+            frame = frame.f_back
+        return False
+
+    def _sample(self, own_ident: int) -> None:
+        thread_names = {t.ident: t.name for t in threading.enumerate()}
+
+        for ident, frame in sys._current_frames().items():
+            if ident == own_ident or self._is_idle(frame):
+                continue
+
+            stack = []
+            while frame is not None:
+                stack.append(self._frame_label(frame.f_code))
+                frame = frame.f_back
+            stack.append(thread_names.get(ident, str(ident)).replace(";", ":"))
+            self._samples[";".join(reversed(stack))] += 1
+
+    def run(self, duration: float) -> str:
+        """
+        Sample all threads for a fixed window.
+
+        Args:
+            duration: Seconds to sample for (capped by settings).
+
+        Returns:
+            Collapsed stacks, one "frame;frame;frame count" line per stack.
+
+        Raises:
+            RuntimeError: If another profiling run is in progress.
+        """
+        duration = min(duration, get_settings().profiler_max_seconds)
+
+        if not self._run_lock.acquire(blocking=False):
+            raise RuntimeError("A profiling run is already in progress")
+
+        try:
+            self._samples.clear()
+            own_ident = threading.get_ident()
+            deadline = time.monotonic() + duration
+            logger.info(f"Sampling profiler started for {duration:.0f}s")
+
+            while time.monotonic() < deadline:
+                self._sample(own_ident)
+                time.sleep(self.interval)
+
+            logger.info(
+                f"Sampling profiler finished with {sum(self._samples.values())} samples"
+            )
+        finally:
+            self._run_lock.release()
+
+        return "\n".join(
+            f"{stack} {count}" for stack, count in self._samples.most_common()
+        ) + "\n"
@@ -8,6 +8,7 @@ import boto3
 from botocore.exceptions import ClientError
 
 from app.config import get_settings
+from app.utils.profiling import timed
 
 logger = logging.getLogger(__name__)
 
@@ -57,6 +58,7 @@ def get_secret(secret_name: Optional[str] = None) -> Optional[dict]:
         return None
 
 
+@timed()
 def get_db_credentials() -> dict:
     """
     Get database credentials from Secrets Manager or environment.
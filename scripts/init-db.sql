@@ -19,8 +19,24 @@ CREATE INDEX IF NOT EXISTS idx_users_username ON users(username);
 CREATE INDEX IF NOT EXISTS idx_users_email ON users(email);
 CREATE INDEX IF NOT EXISTS idx_users_is_active ON users(is_active);
 
+-- Create usage table (daily Bedrock token usage per user and model)
+CREATE TABLE IF NOT EXISTS usage (
+    id SERIAL PRIMARY KEY,
+    username VARCHAR(50) NOT NULL,
+    model_id VARCHAR(255) NOT NULL,
+    day DATE NOT NULL,
+    input_tokens BIGINT DEFAULT 0 NOT NULL,
+    output_tokens BIGINT DEFAULT 0 NOT NULL,
+    request_count INTEGER DEFAULT 0 NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL,
+    CONSTRAINT uq_usage_user_model_day UNIQUE (username, model_id, day)
+);
+
+CREATE INDEX IF NOT EXISTS idx_usage_username ON usage(username);
+
 -- Insert default admin user
--- Password: admin123 (bcrypt hash)
+-- Password: admin123 (bcrypt hash, cost 12; re-hashed at the instance's
+-- calibrated cost on first successful login)
 -- IMPORTANT: Change this password in production!
 INSERT INTO users (username, email, password_hash, is_active, is_admin)
 VALUES (
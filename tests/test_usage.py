@@ -0,0 +1,127 @@
+"""Tests for token usage accounting."""
+
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Tuple
+
+import pytest
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.sql.dml import Insert
+
+from app.chat import bedrock_client, usage
+from app.chat.bedrock_client import BedrockChatClient
+from app.chat.fake import FakeBedrockChatModel
+from app.chat.usage import UsageTracker
+
+
+class FakeUsageTable:
+    """In-memory stand-in for the usage table behind get_db_session."""
+
+    def __init__(self):
+        self.tokens: Dict[Tuple[str, object], int] = {}
+        self.fail_writes = False
+
+    def execute(self, stmt, params=None):
+        if isinstance(stmt, Insert):
+            if self.fail_writes:
+                raise OperationalError("INSERT", {}, Exception("connection lost"))
+            for row in params:
+                key = (row["username"], row["day"])
+                tokens = row["input_tokens"] + row["output_tokens"]
+                self.tokens[key] = self.tokens.get(key, 0) + tokens
+            return None
+
+        bound = stmt.compile().params
+        total = self.tokens.get((bound["username_1"], bound["day_1"]), 0)
+        return FakeResult(total)
+
+    @contextmanager
+    def session(self):
+        yield self
+
+
+class FakeResult:
+    def __init__(self, value: int):
+        self.value = value
+
+    def scalar_one(self) -> int:
+        return self.value
+
+
+@pytest.fixture
+def table(monkeypatch) -> FakeUsageTable:
+    fake = FakeUsageTable()
+    monkeypatch.setattr(usage, "get_db_session", fake.session)
+    return fake
+
+
+@pytest.fixture
+def tracker():
+    tracker = UsageTracker(flush_interval=3600, daily_quota=1000)
+    tracker.start()
+    yield tracker
+    tracker.stop()
+
+
+def today():
+    return datetime.utcnow().date()
+
+
+def test_record_is_ignored_until_started(table):
+    tracker = UsageTracker(flush_interval=3600, daily_quota=1000)
+
+    tracker.record("alice", "model", 60, 40)
+
+    assert tracker.daily_total("alice") == 0
+    assert tracker.flush() == 0
+
+
+def test_flush_then_seed_does_not_double_count(table, tracker):
+    # Tokens flushed earlier by another instance
+    table.tokens[("alice", today())] = 30
+
+    tracker.record("alice", "model", 60, 40)
+    assert tracker.flush() == 1
+    assert table.tokens[("alice", today())] == 130
+
+    assert tracker.check_quota("alice")
+    assert tracker.daily_total("alice") == 130
+
+    tracker.record("alice", "model", 10, 10)
+    assert tracker.daily_total("alice") == 150
+
+
+def test_record_before_seed_keeps_unflushed_tokens(table, tracker):
+    table.tokens[("alice", today())] = 30
+
+    tracker.record("alice", "model", 60, 40)
+    assert tracker.check_quota("alice")
+    assert tracker.daily_total("alice") == 130
+
+    tracker.flush()
+    assert tracker.daily_total("alice") == 130
+
+
+def test_failed_flush_restores_counters(table, tracker):
+    tracker.record("alice", "model", 60, 40)
+
+    table.fail_writes = True
+    assert tracker.flush() == 0
+    assert tracker.daily_total("alice") == 100
+
+    tracker.record("alice", "model", 5, 5)
+    table.fail_writes = False
+    assert tracker.flush() == 1
+    assert table.tokens[("alice", today())] == 110
+    assert tracker.daily_total("alice") == 110
+
+
+def test_stream_stopped_early_records_usage(table, tracker, monkeypatch):
+    monkeypatch.setattr(bedrock_client, "get_usage_tracker", lambda: tracker)
+    client = BedrockChatClient(llm=FakeBedrockChatModel(latency=0, output_tokens=64))
+
+    stream = client.chat_stream("hello there", username="alice")
+    next(stream)
+    stream.close()
+
+    assert tracker.daily_total("alice") > 0